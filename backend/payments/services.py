@@ -13,6 +13,10 @@ import json
 
 logger = logging.getLogger(__name__)
 
+# (connect, read) timeouts in seconds for Strike API calls, so a hung request
+# can't hold a worker indefinitely
+STRIKE_REQUEST_TIMEOUT = (3.05, 10)
+
 
 class StrikeAPIException(Exception):
     """Custom exception for Strike API errors"""
@@ -84,13 +88,13 @@ class StrikeAPIService:
                 logger.debug(f"Request data: {json.dumps(data)}")
             
             if method.upper() == 'GET':
-                response = requests.get(url, headers=self.headers, params=data)
+                response = requests.get(url, headers=self.headers, params=data, timeout=STRIKE_REQUEST_TIMEOUT)
             elif method.upper() == 'POST':
-                response = requests.post(url, headers=self.headers, json=data)
+                response = requests.post(url, headers=self.headers, json=data, timeout=STRIKE_REQUEST_TIMEOUT)
             elif method.upper() == 'PUT':
-                response = requests.put(url, headers=self.headers, json=data)
+                response = requests.put(url, headers=self.headers, json=data, timeout=STRIKE_REQUEST_TIMEOUT)
             elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=self.headers)
+                response = requests.delete(url, headers=self.headers, timeout=STRIKE_REQUEST_TIMEOUT)
             else:
                 raise StrikeAPIException(f"Unsupported HTTP method: {method}")
             
@@ -0,0 +1,25 @@
+"""
+API renderers for the property management system.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+    Types orjson doesn't handle natively (Decimal, lazy strings, timedeltas,
+    querysets, ...) fall back to DRF's encoder, so the output matches JSONRenderer.
+    Indented output (browsable API, ?indent=) still goes through JSONRenderer.
+    """
+    _fallback = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self._fallback, option=ORJSON_OPTIONS)
@@ -1,6 +1,21 @@
+import csv
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from django.http import StreamingHttpResponse
+from .models import CustomUser, WebAuthnCredential, with_passkey_flag
+
+
+class WebAuthnCredentialInline(admin.TabularInline):
+    """Registered passkeys, shown on the user page so they can be revoked."""
+    model = WebAuthnCredential
+    extra = 0
+    fields = ['created_at', 'sign_count']
+    readonly_fields = ['created_at', 'sign_count']
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -47,10 +62,6 @@ class CustomUserAdmin(UserAdmin):
             'classes': ('collapse',),
             'description': 'Legacy fields for backward compatibility'
         }),
-        ('WebAuthn/Passkeys', {
-            'fields': ('webauthn_credentials',),
-            'classes': ('collapse',),
-        }),
     )
     
     # Fields to show when adding a new user
@@ -63,11 +74,57 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
     
-    # Make webauthn_credentials read-only for safety
-    readonly_fields = ['webauthn_credentials']
+    actions = ['export_users_csv']
+    
+    # Columns written by the CSV export
+    export_fields = ['id', 'email', 'first_name', 'last_name', 'phone_number',
+                     'company', 'role', 'is_active', 'date_joined', 'last_login']
+    
+    inlines = [WebAuthnCredentialInline]
+    
+    def get_queryset(self, request):
+        """Annotate passkey presence so the changelist doesn't query per row."""
+        return with_passkey_flag(super().get_queryset(request))
     
     def has_passkey(self, obj):
         """Display if user has a registered passkey"""
-        return bool(obj.webauthn_credentials)
+        return obj.has_passkey
     has_passkey.boolean = True
     has_passkey.short_description = 'Has Passkey'
+    
+    def export_users_csv(self, request, queryset):
+        """
+        Stream the selected users as CSV.
+        Rows are read through a chunked iterator so memory stays flat
+        regardless of how many users are selected.
+        """
+        writer = csv.writer(_Echo())
+        rows = queryset.values_list(*self.export_fields).iterator(chunk_size=2000)
+        
+        def stream():
+            yield writer.writerow(self.export_fields)
+            for row in rows:
+                yield writer.writerow([_csv_safe(value) for value in row])
+        
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="users.csv"'
+        return response
+    export_users_csv.short_description = "Export selected users as CSV"
+
+
+# Leading characters that make spreadsheet applications treat a cell as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_safe(value):
+    """Quote user-controlled text that a spreadsheet would otherwise evaluate as a formula."""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+    
+    def write(self, value):
+        return value
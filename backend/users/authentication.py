@@ -0,0 +1,52 @@
+"""
+Authentication classes for the users app.
+"""
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+# Seconds an authenticated user stays cached; saves and deletes invalidate it sooner
+USER_CACHE_TIMEOUT = 60
+
+# Columns kept in the cache: what authentication, permission checks and the
+# views read from request.user. Everything else, notably the password hash,
+# stays out of the cache and is loaded from the database on access.
+CACHED_USER_FIELDS = ('id', 'email', 'first_name', 'last_name', 'role',
+                      'is_active', 'is_staff', 'is_superuser', 'is_landlord', 'is_tenant')
+
+
+def user_cache_key(user_id):
+    """Cache key for the user resolved from a JWT."""
+    return f'jwt-user:{user_id}'
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that caches the user resolved from the token.
+    Avoids a users table lookup on every authenticated request.
+    Only safe with a cache shared by all workers (see settings.CACHES).
+    """
+    
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        
+        key = user_cache_key(user_id)
+        fields = cache.get(key)
+        if fields is not None:
+            # Columns not cached are deferred and load on first access
+            return self.user_model.from_db(
+                router.db_for_read(self.user_model), list(fields), list(fields.values()),
+            )
+        
+        # Raises AuthenticationFailed for missing or inactive users, which are never cached
+        user = super().get_user(validated_token)
+        # from_db expects the values in the model's column order
+        fields = {
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields if field.attname in CACHED_USER_FIELDS
+        }
+        cache.set(key, fields, USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_update_existing_users_to_basic_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebAuthnCredential',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credential_id', models.BinaryField(help_text='Raw credential ID returned by the authenticator', unique=True)),
+                ('public_key', models.BinaryField(help_text='COSE-encoded credential public key')),
+                ('sign_count', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='passkeys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'WebAuthn Credential',
+                'verbose_name_plural': 'WebAuthn Credentials',
+                'db_table': 'users_webauthncredential',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:13
+
+import base64
+import json
+from datetime import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def copy_credentials_to_model(apps, schema_editor):
+    """Decode each user's JSON credential blob once into a WebAuthnCredential row."""
+    CustomUser = apps.get_model('users', 'CustomUser')
+    WebAuthnCredential = apps.get_model('users', 'WebAuthnCredential')
+    
+    users = CustomUser.objects.exclude(webauthn_credentials__isnull=True).exclude(webauthn_credentials='')
+    for user in users.only('id', 'webauthn_credentials').iterator():
+        try:
+            stored = json.loads(user.webauthn_credentials)
+            created_at = stored.get('created_at')
+            WebAuthnCredential.objects.create(
+                user_id=user.id,
+                credential_id=base64.b64decode(stored['id']),
+                public_key=base64.b64decode(stored['public_key']),
+                sign_count=stored.get('sign_count') or 0,
+                created_at=datetime.fromisoformat(created_at) if created_at else timezone.now(),
+            )
+        except (ValueError, KeyError, TypeError):
+            # Unreadable blob; the user will need to register the passkey again
+            continue
+
+
+def copy_credentials_to_json(apps, schema_editor):
+    """Write each user's first credential back into the JSON blob."""
+    CustomUser = apps.get_model('users', 'CustomUser')
+    WebAuthnCredential = apps.get_model('users', 'WebAuthnCredential')
+    
+    seen = set()
+    for credential in WebAuthnCredential.objects.order_by('user_id', 'created_at').iterator():
+        if credential.user_id in seen:
+            continue
+        seen.add(credential.user_id)
+        CustomUser.objects.filter(pk=credential.user_id).update(webauthn_credentials=json.dumps({
+            'id': base64.b64encode(bytes(credential.credential_id)).decode('utf-8'),
+            'public_key': base64.b64encode(bytes(credential.public_key)).decode('utf-8'),
+            'sign_count': credential.sign_count,
+            'created_at': str(credential.created_at),
+        }))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_webauthncredential'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_credentials_to_model, copy_credentials_to_json),
+    ]
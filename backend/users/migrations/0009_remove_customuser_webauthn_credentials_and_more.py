@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_migrate_webauthn_credentials'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='webauthn_credentials',
+        ),
+        # Challenges now travel in a signed cookie instead of the user row
+        migrations.RemoveField(
+            model_name='customuser',
+            name='webauthn_challenge',
+        ),
+    ]
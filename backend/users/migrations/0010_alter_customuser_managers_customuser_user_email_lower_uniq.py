@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-16 10:02
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.functions.text
+from django.db.models.functions import Lower
+import users.models
+
+
+def lowercase_emails(apps, schema_editor):
+    """Lowercase stored emails so they match the case-insensitive lookups."""
+    CustomUser = apps.get_model('users', 'CustomUser')
+    
+    duplicates = list(
+        CustomUser.objects.values(lower_email=Lower('email'))
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('lower_email', flat=True)
+    )
+    if duplicates:
+        # Merging accounts needs a human decision, so stop before changing anything
+        raise RuntimeError(
+            'Users share an email address that differs only by case; merge or rename '
+            'them before migrating: ' + ', '.join(sorted(duplicates))
+        )
+    
+    CustomUser.objects.exclude(email=Lower('email')).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_remove_customuser_webauthn_credentials_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', users.models.CustomUserManager()),
+            ],
+        ),
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_email_lower_uniq'),
+        ),
+    ]
@@ -1,5 +1,27 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+
+def format_full_name(first_name, last_name, email):
+    """"First Last", falling back to the email when both names are blank."""
+    return f"{first_name} {last_name}".strip() or email
+
+
+def email_matches(email):
+    """Case-insensitive email filter that can use the user_email_lower_uniq index."""
+    return Exact(Lower('email'), email.lower())
+
+
+class CustomUserManager(UserManager):
+    """User manager whose natural-key (login) lookup ignores email case."""
+    
+    def get_by_natural_key(self, username):
+        return self.get(email_matches(username))
+
 
 class CustomUser(AbstractUser):
     """
@@ -27,10 +49,6 @@ class CustomUser(AbstractUser):
     is_landlord = models.BooleanField(default=False)
     is_tenant = models.BooleanField(default=False)
     
-    # WebAuthn/Passkeys support
-    webauthn_credentials = models.TextField(blank=True, null=True, help_text="JSON data for WebAuthn credentials")
-    webauthn_challenge = models.CharField(max_length=500, blank=True, null=True, help_text="Temporary challenge for WebAuthn registration/login")
-    
     # Dashboard preferences
     dashboard_preferences = models.JSONField(default=dict, null=True, blank=True, help_text="User's dashboard customization preferences")
     
@@ -41,27 +59,52 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
+    objects = CustomUserManager()
+    
     class Meta:
         db_table = 'users_customuser'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='user_email_lower_uniq'),
+        ]
     
     def __str__(self):
         return self.email
     
+    def save(self, *args, **kwargs):
+        # Store emails lowercased so exact lookups and the lower(email) constraint agree
+        if self.email:
+            self.email = self.email.lower()
+        super().save(*args, **kwargs)
+    
     def get_full_name(self):
         """Return the user's full name."""
-        full_name = f"{self.first_name} {self.last_name}".strip()
-        return full_name if full_name else self.email
+        return self.display_name
     
     def get_short_name(self):
         """Return the user's short name."""
         return self.first_name or self.email
     
+    @property
+    def display_name(self):
+        """
+        "First Last", falling back to the email when both are blank.
+        Used for get_full_name and as the passkey display name.
+        """
+        return format_full_name(self.first_name, self.last_name, self.email)
+    
     @property
     def has_passkey(self):
-        """Check if user has a registered passkey."""
-        return bool(self.webauthn_credentials)
+        """
+        Check if user has a registered passkey.
+        Uses the passkey_registered annotation when the queryset provides it
+        (see with_passkey_flag) to avoid a query per user.
+        """
+        registered = self.__dict__.get('passkey_registered')
+        if registered is not None:
+            return registered
+        return self.passkeys.exists()
     
     @property
     def is_basic_user(self):
@@ -118,3 +161,31 @@ class CustomUser(AbstractUser):
         user_level = role_hierarchy.get(self.role, 0)
         required_level = role_hierarchy.get(required_role, 0)
         return user_level >= required_level
+
+
+class WebAuthnCredential(models.Model):
+    """
+    A WebAuthn credential (passkey) registered by a user.
+    Stores the raw credential ID and COSE public key returned by registration.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='passkeys')
+    credential_id = models.BinaryField(unique=True, help_text="Raw credential ID returned by the authenticator")
+    public_key = models.BinaryField(help_text="COSE-encoded credential public key")
+    sign_count = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'users_webauthncredential'
+        verbose_name = 'WebAuthn Credential'
+        verbose_name_plural = 'WebAuthn Credentials'
+        ordering = ['created_at']
+    
+    def __str__(self):
+        return f"Passkey for {self.user.email}"
+
+
+def with_passkey_flag(queryset):
+    """Annotate a CustomUser queryset with passkey_registered, read by CustomUser.has_passkey."""
+    return queryset.annotate(
+        passkey_registered=Exists(WebAuthnCredential.objects.filter(user=OuterRef('pk')))
+    )
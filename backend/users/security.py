@@ -0,0 +1,9 @@
+"""
+Security helpers for the users app.
+"""
+from hmac import compare_digest
+
+# Equality check for secrets (challenges, credential IDs, signatures) whose
+# running time does not depend on where the inputs first differ. Accepts two
+# bytes-like objects or two ASCII strings.
+constant_time_verify = compare_digest
@@ -3,8 +3,7 @@ Serializers for user authentication and profile management.
 """
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from django.contrib.auth import authenticate
-from .models import CustomUser
+from .models import CustomUser, email_matches
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -31,7 +30,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def validate_email(self, value):
         """Validate that email is unique."""
-        if CustomUser.objects.filter(email=value).exists():
+        if CustomUser.objects.filter(email_matches(value)).exists():
             raise serializers.ValidationError("A user with this email already exists")
         return value
     
@@ -52,8 +51,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for user profile information."""
-    full_name = serializers.SerializerMethodField()
-    has_passkey = serializers.SerializerMethodField()
+    full_name = serializers.ReadOnlyField(source='get_full_name')
+    has_passkey = serializers.ReadOnlyField()
     
     class Meta:
         model = CustomUser
@@ -61,14 +60,6 @@ class UserProfileSerializer(serializers.ModelSerializer):
                  'phone_number', 'company', 'role', 'date_joined', 'last_login',
                  'has_passkey')
         read_only_fields = ('id', 'email', 'username', 'date_joined', 'last_login', 'has_passkey')
-    
-    def get_full_name(self, obj):
-        """Get user's full name."""
-        return f"{obj.first_name} {obj.last_name}".strip() or obj.email
-    
-    def get_has_passkey(self, obj):
-        """Check if user has a registered passkey."""
-        return hasattr(obj, 'webauthn_credentials') and bool(obj.webauthn_credentials)
 
 
 class WebAuthnCredentialSerializer(serializers.Serializer):
@@ -83,40 +74,13 @@ class WebAuthnCredentialSerializer(serializers.Serializer):
         return attrs
 
 
-class LoginSerializer(serializers.Serializer):
-    """Serializer for email/password login."""
-    email = serializers.EmailField()
-    password = serializers.CharField()
-    
-    def validate(self, attrs):
-        """Validate login credentials."""
-        email = attrs.get('email')
-        password = attrs.get('password')
-        
-        if email and password:
-            try:
-                user = CustomUser.objects.get(email=email)
-                if not user.check_password(password):
-                    raise serializers.ValidationError('Invalid email or password')
-                
-                if not user.is_active:
-                    raise serializers.ValidationError('User account is disabled')
-                
-                attrs['user'] = user
-                return attrs
-            except CustomUser.DoesNotExist:
-                raise serializers.ValidationError('Invalid email or password')
-        else:
-            raise serializers.ValidationError('Must include email and password')
-
-
 class PasswordResetSerializer(serializers.Serializer):
     """Serializer for password reset request."""
     email = serializers.EmailField()
     
     def validate_email(self, value):
         """Validate that user exists."""
-        if not CustomUser.objects.filter(email=value).exists():
+        if not CustomUser.objects.filter(email_matches(value)).exists():
             raise serializers.ValidationError("No user found with this email address")
         return value
 
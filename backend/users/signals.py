@@ -0,0 +1,16 @@
+"""
+Signal handlers for the users app.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache_key
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached JWT user so the next request reloads it."""
+    cache.delete(user_cache_key(instance.pk))
@@ -1,3 +1,280 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import datetime, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import CustomUser, WebAuthnCredential
+from .views import CHALLENGE_COOKIE, encode_b64url
+
+
+def create_user(email, **extra):
+    return CustomUser.objects.create_user(username=email.split('@')[0], email=email, password='pass1234', **extra)
+
+
+class UserAdminQueryCountTest(APITestCase):
+    """The admin user views run a fixed number of queries however many users exist."""
+
+    def setUp(self):
+        self.admin = create_user('admin@example.com', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        for i in range(5):
+            user = create_user(f'user{i}@example.com')
+            WebAuthnCredential.objects.create(user=user, credential_id=f'cred{i}'.encode(), public_key=b'key')
+
+    def test_user_list_queries(self):
+        # Page count plus one query for the rows, passkey flags included
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('users:user_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 6)
+        self.assertTrue(all(row['has_passkey'] for row in response.data['results'] if row['id'] != self.admin.id))
+
+    def test_user_detail_queries(self):
+        user = CustomUser.objects.get(email='user0@example.com')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('users:user_detail', args=[user.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['has_passkey'])
+
+
+class WebAuthnRegisterChallengeTest(APITestCase):
+    """The registration challenge travels in a signed cookie bound to the user."""
+
+    def setUp(self):
+        self.user = create_user('alice@example.com')
+        self.other = create_user('bob@example.com')
+
+    def begin(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse('users:webauthn_register_begin'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(CHALLENGE_COOKIE, response.cookies)
+        return response
+
+    def complete(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('users:webauthn_register_complete'), {'credential': {'id': 'abc'}}, format='json')
+
+    @mock.patch('users.views.verify_registration_response')
+    def test_happy_path(self, verify):
+        verify.return_value = SimpleNamespace(credential_id=b'cred', credential_public_key=b'key', sign_count=0)
+        begin = self.begin(self.user)
+
+        response = self.complete(self.user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['verified'])
+        challenge = verify.call_args.kwargs['expected_challenge']
+        self.assertEqual(encode_b64url(challenge), begin.data['options']['challenge'])
+        self.assertTrue(WebAuthnCredential.objects.filter(user=self.user, credential_id=b'cred').exists())
+        # The cookie is cleared once the ceremony completes
+        self.assertEqual(response.cookies[CHALLENGE_COOKIE].value, '')
+
+    @mock.patch('users.views.verify_registration_response')
+    def test_missing_cookie(self, verify):
+        response = self.complete(self.user)
+
+        self.assertEqual(response.status_code, 400)
+        verify.assert_not_called()
+
+    @mock.patch('users.views.verify_registration_response')
+    def test_tampered_cookie(self, verify):
+        self.begin(self.user)
+        self.client.cookies[CHALLENGE_COOKIE] = self.client.cookies[CHALLENGE_COOKIE].value + 'x'
+
+        response = self.complete(self.user)
+
+        self.assertEqual(response.status_code, 400)
+        verify.assert_not_called()
+
+    @mock.patch('users.views.verify_registration_response')
+    def test_cookie_issued_to_another_user(self, verify):
+        self.begin(self.other)
+
+        response = self.complete(self.user)
+
+        self.assertEqual(response.status_code, 400)
+        verify.assert_not_called()
+        self.assertFalse(WebAuthnCredential.objects.exists())
+
+
+class WebAuthnLoginChallengeTest(APITestCase):
+    """The login challenge travels in a signed cookie from begin to complete."""
+
+    def setUp(self):
+        self.user = create_user('alice@example.com')
+        self.other = create_user('bob@example.com')
+        self.credential = WebAuthnCredential.objects.create(user=self.user, credential_id=b'alice-cred', public_key=b'key')
+        WebAuthnCredential.objects.create(user=self.other, credential_id=b'bob-cred', public_key=b'key')
+
+    def begin(self, email):
+        response = self.client.post(reverse('users:webauthn_login_begin'), {'email': email}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(CHALLENGE_COOKIE, response.cookies)
+        return response
+
+    def complete(self, credential_id):
+        credential = {'id': encode_b64url(credential_id)}
+        return self.client.post(reverse('users:webauthn_login_complete'), {'credential': credential}, format='json')
+
+    @mock.patch('users.views.verify_authentication_response')
+    def test_happy_path(self, verify):
+        verify.return_value = SimpleNamespace(new_sign_count=7)
+        begin = self.begin('Alice@Example.com')
+
+        response = self.complete(b'alice-cred')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['verified'])
+        self.assertEqual(response.data['user']['email'], 'alice@example.com')
+        self.assertIn('access', response.data)
+        challenge = verify.call_args.kwargs['expected_challenge']
+        self.assertEqual(encode_b64url(challenge), begin.data['options']['challenge'])
+        self.credential.refresh_from_db()
+        self.assertEqual(self.credential.sign_count, 7)
+
+    @mock.patch('users.views.verify_authentication_response')
+    def test_missing_cookie(self, verify):
+        response = self.complete(b'alice-cred')
+
+        self.assertEqual(response.status_code, 400)
+        verify.assert_not_called()
+
+    @mock.patch('users.views.verify_authentication_response')
+    def test_tampered_cookie(self, verify):
+        self.begin('alice@example.com')
+        self.client.cookies[CHALLENGE_COOKIE] = self.client.cookies[CHALLENGE_COOKIE].value + 'x'
+
+        response = self.complete(b'alice-cred')
+
+        self.assertEqual(response.status_code, 400)
+        verify.assert_not_called()
+
+    @mock.patch('users.views.verify_authentication_response')
+    def test_cookie_issued_to_another_user(self, verify):
+        # Bob's challenge must not complete a login with Alice's passkey
+        self.begin('bob@example.com')
+
+        response = self.complete(b'alice-cred')
+
+        self.assertEqual(response.status_code, 400)
+        verify.assert_not_called()
+
+    @mock.patch('users.views.verify_authentication_response')
+    def test_inactive_user_cannot_complete(self, verify):
+        self.begin('alice@example.com')
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.complete(b'alice-cred')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('access', response.data)
+        verify.assert_not_called()
+
+    def test_begin_rejects_non_string_email(self):
+        response = self.client.post(reverse('users:webauthn_login_begin'), {'email': ['alice@example.com']}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class WebAuthnMalformedCredentialTest(APITestCase):
+    """Malformed authenticator bytes are a client error, checked by the real webauthn verifiers."""
+
+    def setUp(self):
+        self.user = create_user('alice@example.com')
+        WebAuthnCredential.objects.create(user=self.user, credential_id=b'alice-cred', public_key=b'key')
+
+    def client_data(self, ceremony, challenge):
+        return encode_b64url(json.dumps({
+            'type': ceremony,
+            'challenge': challenge,
+            'origin': settings.WEBAUTHN_ORIGIN[0],
+            'crossOrigin': False,
+        }).encode())
+
+    def test_register_with_garbage_attestation_object(self):
+        self.client.force_authenticate(self.user)
+        begin = self.client.post(reverse('users:webauthn_register_begin'))
+        credential_id = encode_b64url(b'new-cred')
+        credential = {
+            'id': credential_id,
+            'rawId': credential_id,
+            'type': 'public-key',
+            'response': {
+                'clientDataJSON': self.client_data('webauthn.create', begin.data['options']['challenge']),
+                'attestationObject': encode_b64url(b'\xff\x00 not cbor'),
+            },
+        }
+
+        response = self.client.post(reverse('users:webauthn_register_complete'), {'credential': credential}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebAuthnCredential.objects.filter(credential_id=b'new-cred').exists())
+
+    def test_login_with_truncated_authenticator_data(self):
+        begin = self.client.post(reverse('users:webauthn_login_begin'), {'email': 'alice@example.com'}, format='json')
+        credential_id = encode_b64url(b'alice-cred')
+        credential = {
+            'id': credential_id,
+            'rawId': credential_id,
+            'type': 'public-key',
+            'response': {
+                'clientDataJSON': self.client_data('webauthn.get', begin.data['options']['challenge']),
+                # Authenticator data is at least 37 bytes
+                'authenticatorData': encode_b64url(b'\x00' * 10),
+                'signature': encode_b64url(b'signature'),
+            },
+        }
+
+        response = self.client.post(reverse('users:webauthn_login_complete'), {'credential': credential}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('access', response.data)
+
+
+class CopyCredentialsMigrationTest(TransactionTestCase):
+    """Migration 0008 decodes the legacy JSON credential blobs into WebAuthnCredential rows."""
+
+    migrate_from = ('users', '0007_webauthncredential')
+    migrate_to = ('users', '0008_migrate_webauthn_credentials')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_legacy_blobs_are_decoded(self):
+        apps = self.migrate(self.migrate_from)
+        LegacyUser = apps.get_model('users', 'CustomUser')
+        created_at = datetime(2024, 3, 1, 12, 30, tzinfo=dt_timezone.utc)
+        user = LegacyUser.objects.create(username='alice', email='alice@example.com', webauthn_credentials=json.dumps({
+            'id': base64.b64encode(b'\x01\x02cred').decode('utf-8'),
+            'public_key': base64.b64encode(b'\xa5public-key').decode('utf-8'),
+            'sign_count': 3,
+            'created_at': created_at.isoformat(),
+        }))
+        LegacyUser.objects.create(username='bob', email='bob@example.com', webauthn_credentials='not json')
+        LegacyUser.objects.create(username='carol', email='carol@example.com')
+
+        apps = self.migrate(self.migrate_to)
+        Credential = apps.get_model('users', 'WebAuthnCredential')
+
+        credential = Credential.objects.get()
+        self.assertEqual(credential.user_id, user.id)
+        self.assertEqual(bytes(credential.credential_id), b'\x01\x02cred')
+        self.assertEqual(bytes(credential.public_key), b'\xa5public-key')
+        self.assertEqual(credential.sign_count, 3)
+        self.assertEqual(credential.created_at, created_at)
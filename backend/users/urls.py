@@ -2,6 +2,7 @@
 URL configuration for users app.
 Handles authentication, registration, and user management endpoints.
 """
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -14,7 +15,6 @@ urlpatterns = [
     path('logout/', views.LogoutView.as_view(), name='logout'),
     
     # WebAuthn/Passkeys endpoints
-    path('webauthn/test/', views.WebAuthnTestView.as_view(), name='webauthn_test'),
     path('webauthn/register/begin/', views.WebAuthnRegisterBeginView.as_view(), name='webauthn_register_begin'),
     path('webauthn/register/complete/', views.WebAuthnRegisterCompleteView.as_view(), name='webauthn_register_complete'),
     path('webauthn/login/begin/', views.WebAuthnLoginBeginView.as_view(), name='webauthn_login_begin'),
@@ -23,4 +23,10 @@ urlpatterns = [
     # User management
     path('users/', views.UserListView.as_view(), name='user_list'),
     path('users/<int:pk>/', views.UserDetailView.as_view(), name='user_detail'),
-] 
\ No newline at end of file
+]
+
+# Unauthenticated WebAuthn smoke test, development only
+if settings.DEBUG:
+    urlpatterns += [
+        path('webauthn/test/', views.WebAuthnTestView.as_view(), name='webauthn_test'),
+    ]
@@ -2,47 +2,100 @@
 User authentication views for the property management system.
 Handles registration, login, profile management, and WebAuthn/passkeys.
 """
-from django.contrib.auth import authenticate
-from django.contrib.auth.models import User
 from django.conf import settings
-from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework import status, generics, permissions, serializers
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.exceptions import TokenError
-import json
-import base64
+import logging
+import pybase64 as base64
 from webauthn import generate_registration_options, verify_registration_response
 from webauthn import generate_authentication_options, verify_authentication_response
+from webauthn.helpers.cose import COSEAlgorithmIdentifier
+from webauthn.helpers.exceptions import (
+    InvalidAuthenticationResponse,
+    InvalidAuthenticatorDataStructure,
+    InvalidCBORData,
+    InvalidJSONStructure,
+    InvalidPublicKeyStructure,
+    InvalidRegistrationResponse,
+    UnsupportedPublicKeyType,
+)
 from webauthn.helpers.structs import (
     AuthenticatorSelectionCriteria,
     UserVerificationRequirement,
     ResidentKeyRequirement,
-    PublicKeyCredentialDescriptor,
-    PublicKeyCredentialType,
 )
-from .models import CustomUser
-from .serializers import (
-    UserRegistrationSerializer,
-    UserProfileSerializer,
-    WebAuthnCredentialSerializer,
-    LoginSerializer,
+from .authentication import user_cache_key
+from .security import constant_time_verify
+from .models import CustomUser, WebAuthnCredential, email_matches, format_full_name, with_passkey_flag
+from .serializers import UserRegistrationSerializer, UserProfileSerializer
+
+logger = logging.getLogger(__name__)
+
+# Raised by verify_*_response when the client sends malformed credential data,
+# besides the Invalid*Response failures; all are client errors (400)
+MALFORMED_CREDENTIAL_ERRORS = (
+    InvalidCBORData,
+    InvalidAuthenticatorDataStructure,
+    InvalidJSONStructure,
+    InvalidPublicKeyStructure,
+    UnsupportedPublicKeyType,
+    KeyError,
+    TypeError,
+    ValueError,
 )
-from django.utils import timezone
+
+# Model columns behind UserProfileSerializer.Meta.fields
+PROFILE_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name',
+                  'phone_number', 'company', 'role', 'date_joined', 'last_login')
+
+
+# Renders timestamps exactly like UserProfileSerializer's DateTimeFields
+# (ISO 8601 in the current time zone)
+timestamp_field = serializers.DateTimeField()
+
+
+def profile_representation(data):
+    """
+    Finish a dict of PROFILE_FIELDS values (plus has_passkey) into the
+    UserProfileSerializer representation: add full_name and format timestamps.
+    """
+    data['full_name'] = format_full_name(data['first_name'], data['last_name'], data['email'])
+    data['date_joined'] = timestamp_field.to_representation(data['date_joined'])
+    data['last_login'] = timestamp_field.to_representation(data['last_login'])
+    return data
+
+
+def profile_data(user):
+    """Build the UserProfileSerializer representation of a user without a serializer field walk."""
+    data = {field: getattr(user, field) for field in PROFILE_FIELDS}
+    data['has_passkey'] = user.has_passkey
+    return profile_representation(data)
+
+
+def issue_tokens(user):
+    """Create a JWT pair for the user, signing each token exactly once."""
+    refresh = RefreshToken.for_user(user)
+    # access_token is a property that builds a new AccessToken on every read
+    access = refresh.access_token
+    return {'refresh': str(refresh), 'access': str(access)}
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    """Custom JWT token serializer that adds user information to the token."""
+    """Custom JWT token serializer that adds the user's role flags to the token."""
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        # Add custom claims
-        token['email'] = user.email
-        token['first_name'] = user.first_name
-        token['last_name'] = user.last_name
+        # Only the role flags needed for authorization; profile fields come back in the login response
         token['is_landlord'] = user.is_landlord
         token['is_tenant'] = user.is_tenant
         return token
@@ -51,25 +104,23 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 class CustomTokenObtainPairView(TokenObtainPairView):
     """Custom login view that returns user data along with tokens."""
     serializer_class = CustomTokenObtainPairSerializer
-    
+
+    def get_serializer_context(self):
+        # The token serializer only reads the request (for authenticate())
+        return {'request': self.request}
+
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         try:
             serializer.is_valid(raise_exception=True)
-        except Exception as e:
+        except (ValidationError, AuthenticationFailed):
             return Response({'detail': 'Invalid email or password'}, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Get user from validated data
-        user = serializer.user
+        # The serializer has already signed the token pair; reuse it rather than issuing a second one
+        data = serializer.validated_data
+        data['user'] = UserProfileSerializer(serializer.user).data
         
-        # Generate tokens
-        refresh = RefreshToken.for_user(user)
-        
-        return Response({
-            'user': UserProfileSerializer(user).data,
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
-        })
+        return Response(data)
 
 
 class RegisterView(generics.CreateAPIView):
@@ -82,14 +133,12 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        
-        # Generate JWT tokens for the new user
-        refresh = RefreshToken.for_user(user)
+        # A brand-new account cannot have a passkey yet; skip the lookup in has_passkey
+        user.passkey_registered = False
         
         return Response({
-            'user': UserProfileSerializer(user).data,
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
+            'user': profile_data(user),
+            **issue_tokens(user),
         }, status=status.HTTP_201_CREATED)
 
 
@@ -99,7 +148,9 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # request.user may come from the auth cache, which only holds the
+        # columns authentication needs; load the full row in one query
+        return with_passkey_flag(CustomUser.objects.all()).get(pk=self.request.user.pk)
 
 
 class LogoutView(APIView):
@@ -107,13 +158,14 @@ class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
+        # Stop serving this user from the authentication cache
+        cache.delete(user_cache_key(request.user.pk))
         try:
-            refresh_token = request.data["refresh_token"]
-            token = RefreshToken(refresh_token)
-            token.blacklist()
-            return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
-        except Exception as e:
+            token = RefreshToken(request.data["refresh_token"])
+        except (TokenError, KeyError) as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        token.blacklist()
+        return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
 
 
 class UserListView(generics.ListAPIView):
@@ -121,6 +173,31 @@ class UserListView(generics.ListAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = PageNumberPagination
+    ordering = ['-date_joined']
+    ordering_fields = ['email', 'first_name', 'last_name', 'company', 'role', 'date_joined', 'last_login']
+    
+    # Columns read per row
+    list_fields = PROFILE_FIELDS
+    
+    def get_queryset(self):
+        # Passkey presence comes from one subquery instead of a query per user
+        return with_passkey_flag(super().get_queryset())
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Render rows straight from .values() instead of hydrating a model
+        instance and running the serializer for every user.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *self.list_fields, has_passkey=F('passkey_registered'),
+        )
+        
+        page = self.paginate_queryset(queryset)
+        rows = [profile_representation(row) for row in (queryset if page is None else page)]
+        if page is None:
+            return Response(rows)
+        return self.get_paginated_response(rows)
 
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -128,6 +205,95 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAdminUser]
+    
+    def get_queryset(self):
+        return with_passkey_flag(super().get_queryset())
+
+
+def encode_b64url(value):
+    """Encode raw bytes as unpadded base64url, the encoding WebAuthn uses on the wire."""
+    return base64.urlsafe_b64encode(value).rstrip(b'=').decode('ascii')
+
+
+def decode_b64url(value):
+    """Decode an unpadded base64url string (e.g. a credential ID sent by the browser) to raw bytes."""
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+# The pending challenge travels in a short-lived signed cookie between the
+# begin and complete requests instead of being written to the user's row
+CHALLENGE_COOKIE = 'webauthn_challenge'
+CHALLENGE_COOKIE_PATH = '/api/auth/webauthn/'
+CHALLENGE_MAX_AGE = 120
+challenge_signer = signing.TimestampSigner(salt='users.webauthn.challenge')
+
+
+def set_challenge_cookie(response, challenge, user_id):
+    """Attach the signed challenge for user_id to a begin response."""
+    value = challenge_signer.sign(f"{encode_b64url(challenge)}:{user_id}")
+    response.set_cookie(
+        CHALLENGE_COOKIE,
+        value,
+        max_age=CHALLENGE_MAX_AGE,
+        path=CHALLENGE_COOKIE_PATH,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite='Strict',
+    )
+    return response
+
+
+def read_challenge_cookie(request):
+    """
+    Return (challenge, user_id) from the challenge cookie, or None if it is
+    missing, expired or tampered with. Needs no database access.
+    """
+    value = request.COOKIES.get(CHALLENGE_COOKIE)
+    if not value:
+        return None
+    try:
+        payload = challenge_signer.unsign(value, max_age=CHALLENGE_MAX_AGE)
+    except signing.BadSignature:  # Includes SignatureExpired
+        return None
+    encoded, _, user_id = payload.rpartition(':')
+    return decode_b64url(encoded), user_id
+
+
+def clear_challenge_cookie(response):
+    """Drop the challenge cookie once a ceremony has completed."""
+    response.delete_cookie(CHALLENGE_COOKIE, path=CHALLENGE_COOKIE_PATH, samesite='Strict')
+    return response
+
+
+# Public key algorithms offered for new passkeys: ES256, EdDSA, RS256
+SUPPORTED_PUB_KEY_ALGS = [
+    COSEAlgorithmIdentifier.ECDSA_SHA_256,
+    COSEAlgorithmIdentifier.EDDSA,
+    COSEAlgorithmIdentifier.RSASSA_PKCS1_v1_5_SHA_256,
+]
+
+AUTHENTICATOR_SELECTION = AuthenticatorSelectionCriteria(
+    resident_key=ResidentKeyRequirement.PREFERRED,
+    user_verification=UserVerificationRequirement.PREFERRED,
+)
+
+# Parts of the registration options that only depend on settings, built once
+STATIC_REGISTRATION_OPTIONS = {
+    'rp': {
+        'id': settings.WEBAUTHN_RP_ID,
+        'name': settings.WEBAUTHN_RP_NAME,
+    },
+    'pubKeyCredParams': [
+        {'alg': alg.value, 'type': 'public-key'}
+        for alg in SUPPORTED_PUB_KEY_ALGS
+    ],
+    'authenticatorSelection': {
+        'residentKey': AUTHENTICATOR_SELECTION.resident_key.value,
+        'userVerification': AUTHENTICATOR_SELECTION.user_verification.value,
+    },
+    'attestation': 'none',
+    'excludeCredentials': [],
+}
 
 
 # WebAuthn/Passkeys Views
@@ -136,105 +302,34 @@ class WebAuthnRegisterBeginView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
-        try:
-            user = request.user
-            print(f"DEBUG: Starting WebAuthn registration for user {user.id}")
-            print(f"DEBUG: User type: {type(user)}")
-            print(f"DEBUG: User ID type: {type(user.id)}")
-            print(f"DEBUG: User email: {user.email}")
-            
-            # Test user data conversion
-            try:
-                user_id_str = str(user.id)
-                print(f"DEBUG: User ID string: {user_id_str}")
-                user_display_name = f"{user.first_name} {user.last_name}".strip() or user.email
-                print(f"DEBUG: User display name: {user_display_name}")
-            except Exception as e:
-                print(f"DEBUG: Error converting user data: {str(e)}")
-                raise
-            
-            # Generate registration options step by step
-            try:
-                print(f"DEBUG: About to call generate_registration_options")
-                options = generate_registration_options(
-                    rp_id=settings.WEBAUTHN_RP_ID,
-                    rp_name=settings.WEBAUTHN_RP_NAME,
-                    user_id=user_id_str,  # Use the string we just created
-                    user_name=user.email,
-                    user_display_name=user_display_name,
-                    authenticator_selection=AuthenticatorSelectionCriteria(
-                        resident_key=ResidentKeyRequirement.PREFERRED,
-                        user_verification=UserVerificationRequirement.PREFERRED,
-                    ),
-                )
-                print(f"DEBUG: Generated options successfully")
-                print(f"DEBUG: Challenge type: {type(options.challenge)}")
-                print(f"DEBUG: User ID type from options: {type(options.user.id)}")
-            except Exception as e:
-                print(f"DEBUG: Error generating registration options: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                raise
-            
-            # Store challenge in user model for verification
-            try:
-                challenge_b64 = base64.b64encode(options.challenge).decode('utf-8')
-                user.webauthn_challenge = challenge_b64
-                user.save()
-                print(f"DEBUG: Challenge stored successfully")
-            except Exception as e:
-                print(f"DEBUG: Error storing challenge: {str(e)}")
-                raise
-            
-            # Prepare response data
-            try:
-                print(f"DEBUG: Preparing response data")
-                response_data = {
-                    'options': {
-                        'rp': {
-                            'id': options.rp.id, 
-                            'name': options.rp.name
-                        },
-                        'user': {
-                            'id': base64.b64encode(options.user.id).decode('utf-8'),
-                            'name': options.user.name,
-                            'displayName': options.user.display_name,
-                        },
-                        'challenge': base64.b64encode(options.challenge).decode('utf-8'),
-                        'pubKeyCredParams': [
-                            {'alg': param.alg, 'type': param.type} 
-                            for param in options.pub_key_cred_params
-                        ],
-                        'timeout': options.timeout,
-                        'excludeCredentials': [],
-                        'authenticatorSelection': {
-                            'residentKey': (
-                                options.authenticator_selection.resident_key 
-                                if options.authenticator_selection 
-                                else 'preferred'
-                            ),
-                            'userVerification': (
-                                options.authenticator_selection.user_verification 
-                                if options.authenticator_selection 
-                                else 'preferred'
-                            ),
-                        },
-                        'attestation': options.attestation,
-                    }
-                }
-                print(f"DEBUG: Response data prepared successfully")
-                return Response(response_data)
-            except Exception as e:
-                print(f"DEBUG: Error preparing response data: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                raise
-            
-        except Exception as e:
-            print(f"DEBUG: Error in WebAuthn registration begin: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user
+        logger.debug("WebAuthn registration begin for user %s", user.id)
+        
+        # Generate registration options
+        options = generate_registration_options(
+            rp_id=settings.WEBAUTHN_RP_ID,
+            rp_name=settings.WEBAUTHN_RP_NAME,
+            user_id=str(user.id),
+            user_name=user.email,
+            user_display_name=user.display_name,
+            authenticator_selection=AUTHENTICATOR_SELECTION,
+            supported_pub_key_algs=SUPPORTED_PUB_KEY_ALGS,
+        )
+        
+        # Only the per-user and per-challenge fields are filled in here
+        response_data = {
+            'options': {
+                **STATIC_REGISTRATION_OPTIONS,
+                'user': {
+                    'id': encode_b64url(options.user.id),
+                    'name': options.user.name,
+                    'displayName': options.user.display_name,
+                },
+                'challenge': encode_b64url(options.challenge),
+                'timeout': options.timeout,
+            }
+        }
+        return set_challenge_cookie(Response(response_data), options.challenge, user.id)
 
 
 class WebAuthnRegisterCompleteView(APIView):
@@ -242,72 +337,38 @@ class WebAuthnRegisterCompleteView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
+        user = request.user
+        credential_data = request.data.get('credential')
+        pending = read_challenge_cookie(request)
+        
+        logger.debug("WebAuthn registration complete for user %s (challenge found: %s)", user.id, bool(pending))
+        
+        if pending is None or not constant_time_verify(pending[1], str(user.id)):
+            return Response({'error': 'No challenge found'}, status=status.HTTP_400_BAD_REQUEST)
+        challenge = pending[0]
+        
+        # Verify the registration response
         try:
-            user = request.user
-            credential_data = request.data.get('credential')
-            challenge = user.webauthn_challenge
-            
-            print(f"DEBUG: WebAuthn registration complete for user {user.id}")
-            print(f"DEBUG: Challenge found: {bool(challenge)}")
-            
-            if not challenge:
-                return Response({'error': 'No challenge found'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Decode the challenge
-            challenge_bytes = base64.b64decode(challenge)
-            
-            print(f"DEBUG: About to verify registration response")
-            
-            # Verify the registration response
             verification = verify_registration_response(
                 credential=credential_data,
-                expected_challenge=challenge_bytes,
+                expected_challenge=challenge,
                 expected_origin=settings.WEBAUTHN_ORIGIN,
                 expected_rp_id=settings.WEBAUTHN_RP_ID,
             )
-            
-            print(f"DEBUG: Verification completed")
-            print(f"DEBUG: Verification object type: {type(verification)}")
-            print(f"DEBUG: Verification object attributes: {dir(verification)}")
-            
-            # Check if verification was successful
-            # Note: VerifiedRegistration object may not have 'verified' attribute
-            # Let's check if verification object exists and has credential data
-            if verification and hasattr(verification, 'credential_id'):
-                print(f"DEBUG: Registration verification successful")
-                
-                # Store the credential
-                import json
-                
-                print(f"DEBUG: credential_id type: {type(verification.credential_id)}")
-                print(f"DEBUG: public_key type: {type(verification.credential_public_key)}")
-                
-                credential_info = {
-                    'id': base64.b64encode(verification.credential_id).decode('utf-8'),
-                    'public_key': base64.b64encode(verification.credential_public_key).decode('utf-8'),
-                    'sign_count': verification.sign_count,
-                    'created_at': str(timezone.now()),
-                }
-                
-                print(f"DEBUG: Credential info created successfully")
-                
-                # Store in user model
-                user.webauthn_credentials = json.dumps(credential_info)
-                user.webauthn_challenge = None  # Clear the challenge
-                user.save()
-                
-                print(f"DEBUG: User updated successfully, passkey registered")
-                
-                return Response({'verified': True})
-            else:
-                print(f"DEBUG: Verification failed - no credential_id found")
-                return Response({'error': 'Verification failed'}, status=status.HTTP_400_BAD_REQUEST)
-                
-        except Exception as e:
-            print(f"DEBUG: Error in WebAuthn registration complete: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except (InvalidRegistrationResponse, *MALFORMED_CREDENTIAL_ERRORS) as e:
+            logger.exception("WebAuthn registration complete failed")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        WebAuthnCredential.objects.create(
+            user=user,
+            credential_id=verification.credential_id,
+            public_key=verification.credential_public_key,
+            sign_count=verification.sign_count,
+        )
+        
+        logger.debug("Passkey registered for user %s", user.id)
+        
+        return clear_challenge_cookie(Response({'verified': True}))
 
 
 class WebAuthnLoginBeginView(APIView):
@@ -315,68 +376,48 @@ class WebAuthnLoginBeginView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
+        email = request.data.get('email')
+        
+        if not email or not isinstance(email, str):
+            return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            print(f"DEBUG: Starting WebAuthn login begin")
-            
-            email = request.data.get('email')
-            print(f"DEBUG: Email: {email}")
-            
-            if not email:
-                return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                user = CustomUser.objects.get(email=email)
-                print(f"DEBUG: User found: {user.email}")
-            except CustomUser.DoesNotExist:
-                print(f"DEBUG: User not found for email: {email}")
-                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            # Check if user has WebAuthn credentials
-            if not hasattr(user, 'webauthn_credentials') or not user.webauthn_credentials:
-                print(f"DEBUG: No passkey found for user")
-                return Response({'error': 'No passkey found for this user'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Get stored credentials
-            stored_credentials = json.loads(user.webauthn_credentials)
-            print(f"DEBUG: Stored credentials loaded successfully")
-            
-            # Create allowCredentials array with the user's credential ID
-            allow_credentials = [{
+            user = CustomUser.objects.only('id').get(email_matches(email))
+        except CustomUser.DoesNotExist:
+            logger.debug("WebAuthn login begin for unknown email")
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        # Create allowCredentials array from the user's registered credential IDs
+        allow_credentials = [
+            {
                 'type': 'public-key',
-                'id': stored_credentials['id'],  # This is already base64 encoded
+                'id': encode_b64url(credential_id),
                 'transports': ['usb', 'ble', 'nfc', 'internal']
-            }]
-            
-            print(f"DEBUG: Allow credentials created: {len(allow_credentials)} credentials")
-            
-            # Generate authentication options
-            options = generate_authentication_options(
-                rp_id=settings.WEBAUTHN_RP_ID,
-                user_verification=UserVerificationRequirement.PREFERRED,
-            )
-            
-            print(f"DEBUG: Authentication options generated successfully")
-            
-            # Store challenge in user model for verification
-            user.webauthn_challenge = base64.b64encode(options.challenge).decode('utf-8')
-            user.save()
-            
-            print(f"DEBUG: Challenge stored successfully")
-            
-            return Response({
-                'options': {
-                    'challenge': base64.b64encode(options.challenge).decode('utf-8'),
-                    'timeout': options.timeout,
-                    'rpId': options.rp_id,
-                    'allowCredentials': allow_credentials,
-                    'userVerification': options.user_verification,
-                }
-            })
-        except Exception as e:
-            print(f"DEBUG: Error in WebAuthn login begin: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            }
+            for credential_id in user.passkeys.values_list('credential_id', flat=True)
+        ]
+        
+        if not allow_credentials:
+            return Response({'error': 'No passkey found for this user'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Generate authentication options
+        options = generate_authentication_options(
+            rp_id=settings.WEBAUTHN_RP_ID,
+            user_verification=UserVerificationRequirement.PREFERRED,
+        )
+        
+        logger.debug("WebAuthn login begin for user %s", user.id)
+        
+        response = Response({
+            'options': {
+                'challenge': encode_b64url(options.challenge),
+                'timeout': options.timeout,
+                'rpId': options.rp_id,
+                'allowCredentials': allow_credentials,
+                'userVerification': options.user_verification,
+            }
+        })
+        return set_challenge_cookie(response, options.challenge, user.id)
 
 
 class WebAuthnLoginCompleteView(APIView):
@@ -384,93 +425,59 @@ class WebAuthnLoginCompleteView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
+        credential_data = request.data.get('credential')
+        
+        # Reject requests without a valid challenge or credential ID before touching the database
+        pending = read_challenge_cookie(request)
+        if pending is None:
+            return Response({'error': 'No challenge found'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(credential_data, dict) or not isinstance(credential_data.get('id'), str):
+            return Response({'error': 'No stored credentials found'}, status=status.HTTP_400_BAD_REQUEST)
+        challenge, user_id = pending
+        
+        # The authenticator reports which credential it used; it must belong to
+        # the user the challenge was issued to, and deactivated accounts cannot
+        # sign in, as with password login
+        try:
+            credential = WebAuthnCredential.objects.select_related('user').only(
+                'public_key', 'sign_count',
+                *(f'user__{field}' for field in PROFILE_FIELDS),
+            ).get(
+                credential_id=decode_b64url(credential_data['id']),
+                user_id=user_id,
+                user__is_active=True,
+            )
+        except (WebAuthnCredential.DoesNotExist, ValueError):
+            return Response({'error': 'No stored credentials found'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        user = credential.user
+        
+        # Verify the authentication response
         try:
-            print(f"DEBUG: Starting WebAuthn login complete")
-            
-            credential_data = request.data.get('credential')
-            email = request.data.get('email')
-            
-            print(f"DEBUG: Email: {email}")
-            print(f"DEBUG: Credential data received: {credential_data is not None}")
-            
-            if not email:
-                return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                user = CustomUser.objects.get(email=email)
-                print(f"DEBUG: User found: {user.email}")
-            except CustomUser.DoesNotExist:
-                print(f"DEBUG: User not found for email: {email}")
-                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            challenge = user.webauthn_challenge
-            
-            if not challenge:
-                print(f"DEBUG: No challenge found for user")
-                return Response({'error': 'No challenge found'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            print(f"DEBUG: Challenge found: {challenge[:20]}...")
-            
-            # Decode the challenge
-            challenge_bytes = base64.b64decode(challenge)
-            print(f"DEBUG: Challenge decoded successfully")
-            
-            # Get stored credentials
-            if not user.webauthn_credentials:
-                print(f"DEBUG: No stored credentials found for user")
-                return Response({'error': 'No stored credentials found'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            stored_credentials = json.loads(user.webauthn_credentials)
-            print(f"DEBUG: Stored credentials loaded successfully")
-            
-            # Verify the authentication response
-            print(f"DEBUG: About to verify authentication response")
             verification = verify_authentication_response(
                 credential=credential_data,
-                expected_challenge=challenge_bytes,
+                expected_challenge=challenge,
                 expected_origin=settings.WEBAUTHN_ORIGIN,
                 expected_rp_id=settings.WEBAUTHN_RP_ID,
-                credential_public_key=base64.b64decode(stored_credentials['public_key']),
-                credential_current_sign_count=stored_credentials['sign_count'],
+                credential_public_key=bytes(credential.public_key),
+                credential_current_sign_count=credential.sign_count,
             )
-            
-            print(f"DEBUG: Authentication verification completed")
-            print(f"DEBUG: Verification object type: {type(verification)}")
-            print(f"DEBUG: Verification object attributes: {dir(verification)}")
-            
-            # Check if verification was successful
-            # The verification object should have the result - let's check its attributes
-            if verification and hasattr(verification, 'new_sign_count'):
-                print(f"DEBUG: Authentication verification successful")
-                
-                # Update sign count
-                stored_credentials['sign_count'] = verification.new_sign_count
-                user.webauthn_credentials = json.dumps(stored_credentials)
-                user.webauthn_challenge = None  # Clear the challenge
-                user.save()
-                
-                print(f"DEBUG: User credentials updated successfully")
-                
-                # Generate JWT tokens
-                refresh = RefreshToken.for_user(user)
-                
-                print(f"DEBUG: JWT tokens generated successfully")
-                
-                return Response({
-                    'verified': True,
-                    'user': UserProfileSerializer(user).data,
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
-                })
-            else:
-                print(f"DEBUG: Authentication verification failed - no new_sign_count found")
-                return Response({'verified': False, 'error': 'Authentication failed'}, status=status.HTTP_400_BAD_REQUEST)
-                
-        except Exception as e:
-            print(f"DEBUG: Error in WebAuthn login complete: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (InvalidAuthenticationResponse, *MALFORMED_CREDENTIAL_ERRORS) as e:
+            logger.exception("WebAuthn login complete failed for user %s", user.id)
+            return Response({'verified': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Update sign count
+        WebAuthnCredential.objects.filter(pk=credential.pk).update(sign_count=verification.new_sign_count)
+        # The user just signed in with a passkey; skip the lookup in has_passkey
+        user.passkey_registered = True
+        
+        logger.debug("WebAuthn login verified for user %s", user.id)
+        
+        return clear_challenge_cookie(Response({
+            'verified': True,
+            'user': UserProfileSerializer(user).data,
+            **issue_tokens(user),
+        }))
 
 
 class WebAuthnTestView(APIView):
@@ -478,33 +485,17 @@ class WebAuthnTestView(APIView):
     permission_classes = [permissions.AllowAny]  # Allow without authentication for debugging
     
     def get(self, request):
-        try:
-            print(f"DEBUG: Starting WebAuthn registration options test")
-            
-            # Test 1: WebAuthn imports
-            from webauthn import generate_registration_options
-            print("DEBUG: WebAuthn imports successful")
-            
-            # Test 2: Generate registration options with string user_id
-            try:
-                print(f"DEBUG: Testing registration options generation with string user_id")
-                options = generate_registration_options(
-                    rp_id="localhost",
-                    rp_name="Test",
-                    user_id="test123",  # Using string instead of bytes
-                    user_name="test@example.com",
-                    user_display_name="Test User",
-                )
-                print(f"DEBUG: Registration options generated successfully")
-                print(f"DEBUG: Challenge type: {type(options.challenge)}")
-                print(f"DEBUG: User ID type: {type(options.user.id)}")
-                return Response({'status': 'options_generation_success'})
-            except Exception as e:
-                print(f"DEBUG: Registration options generation failed: {str(e)}")
-                raise
-            
-        except Exception as e:
-            print(f"DEBUG: WebAuthn options test failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Generate registration options with a string user_id; failures surface as a DEBUG error page
+        options = generate_registration_options(
+            rp_id="localhost",
+            rp_name="Test",
+            user_id="test123",  # Using string instead of bytes
+            user_name="test@example.com",
+            user_display_name="Test User",
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "WebAuthn test options generated (challenge type: %s, user id type: %s)",
+                type(options.challenge), type(options.user.id),
+            )
+        return Response({'status': 'options_generation_success'})
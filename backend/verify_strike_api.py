@@ -7,24 +7,77 @@ import sys
 import json
 import logging
 import requests
-import django
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Set up Django environment
+# Point Django at the project settings. Only two settings are read, so the
+# app registry is never populated (no django.setup()); the lazy settings
+# object loads the settings module on first access.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'property_control_system.settings')
-django.setup()
 
-# Now import from Django settings
 from django.conf import settings
 
 # Get Strike API credentials from Django settings
 api_key = settings.STRIKE_API_KEY
 api_base_url = settings.STRIKE_API_BASE_URL
 
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Only the first part of a response body is logged
+PREVIEW_BYTES = 512
+
+def create_session():
+    """Create a pooled, retrying session carrying the Strike auth headers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    )
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+    })
+    return session
+
+def read_preview(response):
+    """Read at most PREVIEW_BYTES of a streamed response body"""
+    try:
+        # iter_content wraps urllib3 read errors in requests exceptions
+        body = next(response.iter_content(PREVIEW_BYTES), b'')
+    finally:
+        response.close()
+    return body.decode(response.encoding or 'utf-8', errors='replace')
+
+def check_endpoint(session, endpoint):
+    """Request one Strike endpoint and report whether it answered 200"""
+    url = f"{api_base_url}{endpoint}"
+    logger.info(f"Testing endpoint: {url}")
+    
+    try:
+        response = session.get(url, timeout=REQUEST_TIMEOUT, stream=True)
+        
+        logger.info(f"Response status for {endpoint}: {response.status_code}")
+        preview = read_preview(response)
+        
+        if response.status_code == 200:
+            logger.info(f"Success! Response: {preview}...")
+            return True
+        logger.error(f"Failed to connect: {preview}")
+        
+    except requests.RequestException as e:
+        logger.error(f"Exception: {str(e)}")
+    return False
+
 def test_api_connection():
     """Test basic connection to Strike API"""
     logger.info(f"Testing connection to Strike API: {api_base_url}")
@@ -34,12 +87,8 @@ def test_api_connection():
         logger.error("No API key found in settings")
         return False
     
-    # Create headers with API key
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-    }
+    # One pooled session shared by the endpoint checks
+    session = create_session()
     
     # Test endpoints
     endpoints = [
@@ -49,24 +98,17 @@ def test_api_connection():
     
     success = False
     
-    for endpoint in endpoints:
-        url = f"{api_base_url}{endpoint}"
-        logger.info(f"Testing endpoint: {url}")
-        
-        try:
-            response = requests.get(url, headers=headers)
-            
-            logger.info(f"Response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                logger.info(f"Success! Response: {response.text[:500]}...")
+    # Query the endpoints concurrently; any one answering 200 is enough. Leaving
+    # the block still waits for a check that is already running (bounded by
+    # REQUEST_TIMEOUT), so the session is closed only once no worker uses it.
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+        futures = [executor.submit(check_endpoint, session, endpoint) for endpoint in endpoints]
+        for future in as_completed(futures):
+            if future.result():
                 success = True
                 break
-            else:
-                logger.error(f"Failed to connect: {response.text}")
-                
-        except Exception as e:
-            logger.error(f"Exception: {str(e)}")
+    
+    session.close()
     
     if success:
         logger.info("✅ Strike API connection successful!")
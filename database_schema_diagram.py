@@ -4,41 +4,91 @@ Database Schema Visualizer
 Generates an Entity Relationship Diagram (ERD) for the Property Management System
 """
 
-import matplotlib.pyplot as plt
+import matplotlib
+import matplotlib.style
 import matplotlib.patches as patches
-from matplotlib.patches import FancyBboxPatch, ConnectionPatch
+from matplotlib.patches import FancyBboxPatch
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PatchCollection, PathCollection
+from matplotlib.figure import Figure
+from matplotlib.path import Path
+from matplotlib.transforms import Affine2D
 import numpy as np
+from collections import defaultdict
 from typing import Dict, List, Tuple
+from xml.sax.saxutils import escape
 import math
+import sys
 
 # Set up the plotting style
-plt.style.use('default')
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['font.size'] = 8
-plt.rcParams['figure.figsize'] = (20, 16)
-plt.rcParams['figure.dpi'] = 300
+matplotlib.style.use('default')
+matplotlib.rcParams['font.family'] = 'DejaVu Sans'
+matplotlib.rcParams['font.size'] = 8
+matplotlib.rcParams['figure.figsize'] = (20, 16)
+
+# Resolution of the PNG preview
+PNG_DPI = 150
+
+# Open "->" arrow head, in points (the "->" style at mutation_scale=20)
+ARROW_HEAD_LENGTH = 8
+ARROW_HEAD_HALF_WIDTH = 4
+
+# Color scheme
+COLORS = {
+    'primary': '#2563eb',      # Blue for main entities
+    'secondary': '#7c3aed',    # Purple for related entities
+    'finance': '#059669',      # Green for financial entities
+    'payment': '#dc2626',      # Red for payment entities
+    'user': '#ea580c',         # Orange for user-related
+    'property': '#0891b2',     # Cyan for property-related
+    'tenant': '#be185d',       # Pink for tenant-related
+    'background': '#f8fafc',   # Light gray background
+    'border': '#e2e8f0',       # Border color
+    'text': '#1e293b',         # Dark text
+    'text_light': '#64748b'    # Light text
+}
+
+# Text bbox styles, built once and shared by every table title / relationship label
+TITLE_BBOX_STYLES = {color: dict(boxstyle="round,pad=0.2", facecolor=color, alpha=0.8)
+                     for color in COLORS.values()}
+LABEL_BBOX = dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8)
+
+def compute_edge_geometry(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Geometry for a batch of edges given as (N, 2) start and end arrays.
+    Returns the midpoints, the unit directions (zero for self-references)
+    and a mask of the edges that have a line to draw.
+    """
+    mids = 0.5 * (starts + ends)
+    directions = ends - starts
+    lengths = np.hypot(directions[:, 0], directions[:, 1])
+    has_line = lengths > 0
+    directions[has_line] /= lengths[has_line, np.newaxis]
+    return mids, directions, has_line
 
 class DatabaseSchemaVisualizer:
     def __init__(self):
-        self.fig, self.ax = plt.subplots(1, 1, figsize=(20, 16))
+        # A standalone Agg-backed figure: it is only ever saved to files, so
+        # it is not registered with pyplot or a GUI backend
+        self.fig = Figure(figsize=(20, 16))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(1, 1, 1)
         self.ax.set_xlim(0, 100)
         self.ax.set_ylim(0, 100)
         self.ax.axis('off')
         
         # Color scheme
-        self.colors = {
-            'primary': '#2563eb',      # Blue for main entities
-            'secondary': '#7c3aed',    # Purple for related entities
-            'finance': '#059669',      # Green for financial entities
-            'payment': '#dc2626',      # Red for payment entities
-            'user': '#ea580c',         # Orange for user-related
-            'property': '#0891b2',     # Cyan for property-related
-            'tenant': '#be185d',       # Pink for tenant-related
-            'background': '#f8fafc',   # Light gray background
-            'border': '#e2e8f0',       # Border color
-            'text': '#1e293b',         # Dark text
-            'text_light': '#64748b'    # Light text
-        }
+        self.colors = COLORS
+        
+        # Legend entries: (label, color)
+        self.legend_items = tuple((label, self.colors[key]) for label, key in (
+            ('Primary Entities', 'primary'),
+            ('Property Related', 'property'),
+            ('Tenant Related', 'tenant'),
+            ('User Related', 'user'),
+            ('Financial', 'finance'),
+            ('Payment/Bitcoin', 'payment'),
+        ))
         
         # Define table positions and relationships
         self.tables = {
@@ -181,6 +231,17 @@ class DatabaseSchemaVisualizer:
             }
         }
         
+        # Box corner, text anchors and field text for each table, worked out
+        # once here rather than on every draw
+        for table_info in self.tables.values():
+            x, y = table_info['pos']
+            width, height = table_info['size']
+            left, top = x - width/2, y + height/2
+            table_info['_corner'] = (left, y - height/2)
+            table_info['_title_xy'] = (x, top - 0.5)
+            table_info['_fields_xy'] = (left + 0.3, top - 1.1)
+            table_info['_field_text'] = "\n".join(f"• {field}" for field in table_info['fields'])
+        
         # Define relationships
         self.relationships = [
             # User relationships
@@ -221,90 +282,72 @@ class DatabaseSchemaVisualizer:
             ('payments_strike_invoice', 'payments_webhook_event', '1:N', 'strike_invoice'),
             ('payments_lightning_quote', 'payments_payment_transaction', '1:1', 'lightning_quote'),
         ]
+        
+        # Several foreign keys between the same two tables share one arrow,
+        # labelled with all of their field names
+        grouped = defaultdict(list)
+        for from_table, to_table, rel_type, field in self.relationships:
+            grouped[from_table, to_table, rel_type].append(field)
+        self.grouped_relationships = [
+            (from_table, to_table, rel_type, ', '.join(fields))
+            for (from_table, to_table, rel_type), fields in grouped.items()
+        ]
     
-    def draw_table(self, table_name: str, table_info: Dict):
-        """Draw a table box with fields"""
-        x, y = table_info['pos']
+    def draw_table(self, table_name: str, table_info: Dict) -> FancyBboxPatch:
+        """Draw a table's title and fields; return its box for batched drawing"""
         width, height = table_info['size']
         color = table_info['color']
         
-        # Draw table box
+        # Table box (added to the axes by generate_diagram in one collection)
         box = FancyBboxPatch(
-            (x - width/2, y - height/2), width, height,
+            table_info['_corner'], width, height,
             boxstyle="round,pad=0.1",
             facecolor=color,
             edgecolor=self.colors['border'],
             linewidth=2,
             alpha=0.9
         )
-        self.ax.add_patch(box)
         
         # Draw title
-        self.ax.text(x, y + height/2 - 0.5, table_info['title'], 
+        self.ax.text(*table_info['_title_xy'], table_info['title'], 
                     ha='center', va='center', fontsize=10, fontweight='bold',
-                    color='white', bbox=dict(boxstyle="round,pad=0.2", facecolor=color, alpha=0.8))
+                    color='white', bbox=TITLE_BBOX_STYLES[color])
         
-        # Draw fields
-        for i, field in enumerate(table_info['fields']):
-            field_y = y + height/2 - 1.5 - i * 0.6
-            if field_y > y - height/2 + 0.5:  # Only draw if within table bounds
-                self.ax.text(x - width/2 + 0.3, field_y, f"• {field}", 
-                            ha='left', va='center', fontsize=7, color='white')
-    
-    def draw_relationship(self, from_table: str, to_table: str, rel_type: str, field: str):
-        """Draw a relationship line between tables"""
-        if from_table not in self.tables or to_table not in self.tables:
-            return
-            
-        from_pos = self.tables[from_table]['pos']
-        to_pos = self.tables[to_table]['pos']
+        # Draw fields as one multiline text, one line per field
+        self.ax.text(*table_info['_fields_xy'], table_info['_field_text'],
+                    ha='left', va='top', fontsize=7, color='white', linespacing=1.05)
         
-        # Calculate line start and end points (edge of table boxes)
-        from_size = self.tables[from_table]['size']
-        to_size = self.tables[to_table]['size']
-        
-        # Simple line from center to center for now
-        line = ConnectionPatch(
-            from_pos, to_pos, "data", "data",
-            arrowstyle="->", shrinkA=5, shrinkB=5,
-            mutation_scale=20, fc=self.colors['text_light'],
-            ec=self.colors['text_light'], linewidth=1.5, alpha=0.7
-        )
-        self.ax.add_patch(line)
-        
-        # Add relationship label
-        mid_x = (from_pos[0] + to_pos[0]) / 2
-        mid_y = (from_pos[1] + to_pos[1]) / 2
-        
-        # Adjust label position to avoid overlap
-        if abs(from_pos[0] - to_pos[0]) > abs(from_pos[1] - to_pos[1]):
-            # Horizontal relationship
-            label_y = mid_y + 1
-        else:
-            # Vertical relationship
-            label_x = mid_x + 1
-            label_y = mid_y
-        
-        self.ax.text(mid_x, mid_y, f"{rel_type}\n{field}", 
+        return box
+    
+    def draw_relationship(self, mid: np.ndarray, rel_type: str, field: str):
+        """Draw a relationship label at the midpoint of its line"""
+        self.ax.text(mid[0], mid[1], f"{rel_type}\n{field}", 
                     ha='center', va='center', fontsize=6, 
                     color=self.colors['text'], 
-                    bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8))
+                    bbox=LABEL_BBOX)
+    
+    def draw_arrows(self, starts: np.ndarray, ends: np.ndarray, directions: np.ndarray):
+        """Draw all relationship lines as one LineCollection, arrow heads as one PathCollection"""
+        style = dict(edgecolors=self.colors['text_light'], linewidths=1.5, alpha=0.7)
+        self.ax.add_collection(LineCollection(np.stack([starts, ends], axis=1), **style))
+        
+        # Each head is an open chevron in points, rotated to its line and
+        # placed at the line's end in data coordinates
+        back = -ARROW_HEAD_LENGTH * directions
+        side = ARROW_HEAD_HALF_WIDTH * np.column_stack([-directions[:, 1], directions[:, 0]])
+        heads = np.stack([back + side, np.zeros_like(back), back - side], axis=1)
+        points_to_pixels = Affine2D().scale(1 / 72) + self.fig.dpi_scale_trans
+        self.ax.add_collection(PathCollection(
+            [Path(head) for head in heads], offsets=ends, offset_transform=self.ax.transData,
+            transform=points_to_pixels, facecolors='none', **style
+        ))
     
     def draw_legend(self):
         """Draw a legend explaining the diagram"""
-        legend_items = [
-            ('Primary Entities', self.colors['primary']),
-            ('Property Related', self.colors['property']),
-            ('Tenant Related', self.colors['tenant']),
-            ('User Related', self.colors['user']),
-            ('Financial', self.colors['finance']),
-            ('Payment/Bitcoin', self.colors['payment'])
-        ]
-        
         legend_x = 85
         legend_y = 95
         
-        for i, (label, color) in enumerate(legend_items):
+        for i, (label, color) in enumerate(self.legend_items):
             y_pos = legend_y - i * 2
             # Draw color box
             box = patches.Rectangle((legend_x, y_pos - 0.3), 1, 0.6, 
@@ -331,13 +374,26 @@ class DatabaseSchemaVisualizer:
         # Draw title
         self.draw_title()
         
-        # Draw all tables
-        for table_name, table_info in self.tables.items():
-            self.draw_table(table_name, table_info)
+        # Draw all tables, with the boxes batched into a single collection
+        boxes = [self.draw_table(table_name, table_info)
+                 for table_name, table_info in self.tables.items()]
+        self.ax.add_collection(PatchCollection(boxes, match_original=True))
         
-        # Draw all relationships
-        for from_table, to_table, rel_type, field in self.relationships:
-            self.draw_relationship(from_table, to_table, rel_type, field)
+        # Draw all relationships. Line endpoints and label midpoints are
+        # worked out for every edge at once from the table centers
+        table_index = {name: i for i, name in enumerate(self.tables)}
+        centers = np.array([info['pos'] for info in self.tables.values()], dtype=float)
+        relationships = [rel for rel in self.grouped_relationships
+                         if rel[0] in table_index and rel[1] in table_index]
+        starts = centers[[table_index[rel[0]] for rel in relationships]]
+        ends = centers[[table_index[rel[1]] for rel in relationships]]
+        mids, directions, has_line = compute_edge_geometry(starts, ends)
+        
+        for (_, _, rel_type, field), mid in zip(relationships, mids):
+            self.draw_relationship(mid, rel_type, field)
+        
+        # Simple line from center to center for now; self-references have no line
+        self.draw_arrows(starts[has_line], ends[has_line], directions[has_line])
         
         # Draw legend
         self.draw_legend()
@@ -349,31 +405,167 @@ class DatabaseSchemaVisualizer:
                     color=self.colors['text_light'],
                     bbox=dict(boxstyle="round,pad=0.5", facecolor='white', alpha=0.8))
         
-        plt.tight_layout()
+        self.fig.tight_layout()
         return self.fig
 
-def main():
+class SVGSchemaBuilder:
+    """
+    Writes the ERD as SVG directly from a visualizer's table and relationship
+    data, using string templates instead of matplotlib's render pipeline.
+    Coordinates use the same 0-100 data space, mapped onto a 20x16 inch
+    canvas measured in points.
+    """
+    WIDTH, HEIGHT = 20 * 72, 16 * 72
+    FONT_FAMILY = 'DejaVu Sans, sans-serif'
+    
+    def __init__(self, visualizer: DatabaseSchemaVisualizer):
+        self.tables = visualizer.tables
+        self.relationships = visualizer.grouped_relationships
+        self.colors = visualizer.colors
+        self.legend_items = visualizer.legend_items
+        self.parts = []
+    
+    def px(self, x: float) -> float:
+        return round(x * self.WIDTH / 100, 2)
+    
+    def py(self, y: float) -> float:
+        return round((100 - y) * self.HEIGHT / 100, 2)
+    
+    def text(self, x: float, y: float, content: str, size: float, color: str,
+             anchor: str = 'middle', bold: bool = False):
+        """Add a single-line text element centred vertically on (x, y)"""
+        weight = ' font-weight="bold"' if bold else ''
+        self.parts.append(
+            f'<text x="{self.px(x)}" y="{self.py(y)}" font-size="{size}" fill="{color}" '
+            f'text-anchor="{anchor}" dominant-baseline="central"{weight}>{escape(content)}</text>'
+        )
+    
+    def draw_table(self, table_info: Dict):
+        """Add a table's box, title and fields"""
+        width, height = table_info['size']
+        left, bottom = table_info['_corner']
+        self.parts.append(
+            f'<rect x="{self.px(left)}" y="{self.py(bottom + height)}" '
+            f'width="{self.px(width)}" height="{self.HEIGHT * height / 100:.2f}" rx="1.5" '
+            f'fill="{table_info["color"]}" fill-opacity="0.9" '
+            f'stroke="{self.colors["border"]}" stroke-width="2"/>'
+        )
+        self.text(*table_info['_title_xy'], table_info['title'], 10, 'white', bold=True)
+        
+        field_x, field_y = table_info['_fields_xy']
+        lines = ''.join(
+            f'<tspan x="{self.px(field_x)}" dy="{"0.9em" if i == 0 else "1em"}">{escape(f"• {field}")}</tspan>'
+            for i, field in enumerate(table_info['fields'])
+        )
+        self.parts.append(f'<text y="{self.py(field_y)}" font-size="7" fill="white">{lines}</text>')
+    
+    def draw_relationships(self):
+        """Add every relationship line, with arrow heads and labels"""
+        relationships = [rel for rel in self.relationships
+                         if rel[0] in self.tables and rel[1] in self.tables]
+        starts = np.array([self.tables[rel[0]]['pos'] for rel in relationships], dtype=float)
+        ends = np.array([self.tables[rel[1]]['pos'] for rel in relationships], dtype=float)
+        mids, _, has_line = compute_edge_geometry(starts, ends)
+        
+        for (x0, y0), (x1, y1) in zip(starts[has_line], ends[has_line]):
+            self.parts.append(
+                f'<line x1="{self.px(x0)}" y1="{self.py(y0)}" x2="{self.px(x1)}" y2="{self.py(y1)}" '
+                f'stroke="{self.colors["text_light"]}" stroke-width="1.5" stroke-opacity="0.7" '
+                f'marker-end="url(#arrow)"/>'
+            )
+        
+        # Labels go on top of every line; the white box is sized from the
+        # longest label line (roughly 0.6em per character at 6pt)
+        for (_, _, rel_type, field), (mid_x, mid_y) in zip(relationships, mids):
+            box_width = 0.6 * 6 * max(len(rel_type), len(field)) + 4
+            self.parts.append(
+                f'<rect x="{self.px(mid_x) - box_width / 2:.2f}" y="{self.py(mid_y) - 8:.2f}" '
+                f'width="{box_width:.2f}" height="16" rx="2" fill="white" fill-opacity="0.8" '
+                f'stroke="{self.colors["text"]}" stroke-width="0.5"/>'
+            )
+            self.parts.append(
+                f'<text x="{self.px(mid_x)}" y="{self.py(mid_y) - 3:.2f}" font-size="6" '
+                f'fill="{self.colors["text"]}" text-anchor="middle" dominant-baseline="central">'
+                f'{escape(rel_type)}<tspan x="{self.px(mid_x)}" dy="1.1em">{escape(field)}</tspan></text>'
+            )
+    
+    def draw_legend(self):
+        """Add the category legend"""
+        for i, (label, color) in enumerate(self.legend_items):
+            y_pos = 95 - i * 2
+            self.parts.append(
+                f'<rect x="{self.px(85)}" y="{self.py(y_pos + 0.3)}" width="{self.px(1)}" '
+                f'height="{self.HEIGHT * 0.6 / 100:.2f}" fill="{color}" stroke="{self.colors["border"]}"/>'
+            )
+            self.text(86.5, y_pos, label, 8, self.colors['text'], anchor='start', bold=True)
+    
+    def build(self) -> str:
+        """Return the complete SVG document"""
+        self.parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {self.WIDTH} {self.HEIGHT}" '
+            f'width="{self.WIDTH}pt" height="{self.HEIGHT}pt" font-family="{self.FONT_FAMILY}">',
+            '<defs><marker id="arrow" viewBox="0 0 8 8" refX="8" refY="4" markerWidth="8" '
+            'markerHeight="8" markerUnits="userSpaceOnUse" orient="auto">'
+            f'<path d="M0,0 L8,4 L0,8" fill="none" stroke="{self.colors["text_light"]}" '
+            'stroke-width="1.5"/></marker></defs>',
+            f'<rect width="100%" height="100%" fill="{self.colors["background"]}"/>',
+        ]
+        self.text(50, 98, 'Property Management System - Database Schema', 16, self.colors['text'], bold=True)
+        self.text(50, 96, 'Entity Relationship Diagram (ERD)', 12, self.colors['text_light'])
+        for table_info in self.tables.values():
+            self.draw_table(table_info)
+        self.draw_relationships()
+        self.draw_legend()
+        self.text(5, 6, 'Note: This diagram shows the main entities and their relationships.',
+                  8, self.colors['text_light'], anchor='start')
+        self.text(5, 5, 'Foreign keys are indicated by relationship lines.',
+                  8, self.colors['text_light'], anchor='start')
+        self.parts.append('</svg>')
+        return '\n'.join(self.parts)
+    
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.build())
+
+def main(svg_only: bool = False):
     """Generate and save the database schema diagram"""
     visualizer = DatabaseSchemaVisualizer()
+    
+    # The SVG is written straight from the table data, without rendering
+    # through matplotlib, so it is cheap to produce on its own
+    SVGSchemaBuilder(visualizer).save('database_schema_erd.svg')
+    if svg_only:
+        print("✅ Database schema diagram written to database_schema_erd.svg")
+        return
+    
     fig = visualizer.generate_diagram()
     
+    # Layout is already done (tight_layout in generate_diagram). Work out the
+    # tight bounding box once and reuse it for both files, so neither savefig
+    # runs its own extra layout draw before rendering
+    fig.set_layout_engine(None)
+    renderer = fig.canvas.get_renderer()
+    bbox = fig.get_tightbbox(renderer).padded(matplotlib.rcParams['savefig.pad_inches'])
+    
     # Save the diagram
-    fig.savefig('database_schema_erd.png', dpi=300, bbox_inches='tight', 
+    # The diagram is pure vector content: the PDF is the full-quality output,
+    # the PNG is a raster preview at a moderate resolution
+    fig.savefig('database_schema_erd.png', dpi=PNG_DPI, bbox_inches=bbox, 
                 facecolor=visualizer.colors['background'])
-    fig.savefig('database_schema_erd.pdf', bbox_inches='tight', 
+    fig.savefig('database_schema_erd.pdf', bbox_inches=bbox, 
                 facecolor=visualizer.colors['background'])
     
     print("✅ Database schema diagram generated successfully!")
     print("📁 Files created:")
-    print("   - database_schema_erd.png (high-resolution PNG)")
+    print(f"   - database_schema_erd.png (PNG preview, {PNG_DPI} DPI)")
     print("   - database_schema_erd.pdf (vector PDF)")
+    print("   - database_schema_erd.svg (vector SVG)")
     print("\n🎨 The diagram shows:")
     print("   - 18 main database tables")
     print("   - Color-coded by category (Users, Properties, Tenants, Finance, Payments)")
     print("   - Relationship lines with cardinality")
     print("   - Key fields for each table")
-    
-    plt.show()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # --svg writes only the SVG and skips the matplotlib render
+    main(svg_only='--svg' in sys.argv[1:]) 
\ No newline at end of file
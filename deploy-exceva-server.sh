@@ -280,7 +280,7 @@ module.exports = {
       name: 'exceva-backend',
       cwd: '$PROJECT_PATH/backend',
       script: 'venv/bin/gunicorn',
-      args: '--bind 0.0.0.0:8000 property_control_system.wsgi:application --workers 2 --timeout 120 --max-requests 1000',
+      args: '--bind 0.0.0.0:8000 property_control_system.wsgi:application --workers 2 --worker-class gthread --threads 4 --timeout 120 --max-requests 1000',
       env: {
         DJANGO_SETTINGS_MODULE: 'property_control_system.settings',
         PATH: '$PROJECT_PATH/backend/venv/bin:' + process.env.PATH
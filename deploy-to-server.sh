@@ -230,7 +230,7 @@ module.exports = {
       name: 'property-backend',
       cwd: '$PROJECT_PATH/backend',
       script: 'venv/bin/gunicorn',
-      args: '--bind 0.0.0.0:8000 property_control_system.wsgi:application --workers 2 --timeout 120',
+      args: '--bind 0.0.0.0:8000 property_control_system.wsgi:application --workers 2 --worker-class gthread --threads 4 --timeout 120',
       env: {
         DJANGO_SETTINGS_MODULE: 'property_control_system.settings',
         PATH: '$PROJECT_PATH/backend/venv/bin:' + process.env.PATH
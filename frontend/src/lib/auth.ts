@@ -270,6 +270,7 @@ class AuthService {
       // Start registration
       const beginResponse = await fetch(`${this.baseUrl}/auth/webauthn/register/begin/`, {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${accessToken}`,
@@ -309,6 +310,7 @@ class AuthService {
       console.log('🔐 Completing registration with server...');
       const completeResponse = await fetch(`${this.baseUrl}/auth/webauthn/register/complete/`, {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${accessToken}`,
@@ -349,6 +351,7 @@ class AuthService {
       // Start authentication
       const beginResponse = await fetch(`${this.baseUrl}/auth/webauthn/login/begin/`, {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
         },
@@ -376,6 +379,7 @@ class AuthService {
       // Complete authentication
       const completeResponse = await fetch(`${this.baseUrl}/auth/webauthn/login/complete/`, {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
         },
@@ -5,11 +5,56 @@ Test script to verify API endpoints are working correctly
 
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://localhost:8000"
 
+# Seconds to wait for the dev server before giving up on an endpoint
+REQUEST_TIMEOUT = 5
+
+# Only the start of a response body is printed, so only this much is read
+PREVIEW_BYTES = 2048
+
+# Endpoint checks run concurrently on this many threads
+MAX_WORKERS = 4
+
+# One keep-alive session shared by all endpoint checks, so connections
+# to the dev server are reused instead of reopened per request
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+def read_preview(response):
+    """Read at most PREVIEW_BYTES of a streamed response body"""
+    try:
+        body = next(response.iter_content(PREVIEW_BYTES), b'')
+    finally:
+        response.close()
+    return body.decode(response.encoding or 'utf-8', errors='replace')
+
+def format_report(method, endpoint, status, body):
+    """Format the printed report for one endpoint response"""
+    lines = [f"{method.upper()} {endpoint}", f"Status: {status}"]
+    
+    if status < 500:
+        try:
+            # Fails (and falls back to the raw text) if the body was cut off
+            result = json.loads(body)
+            if 'detail' in result:
+                lines.append(f"Response: {result['detail']}")
+            else:
+                lines.append(f"Response: {json.dumps(result, indent=2)[:200]}...")
+        except (ValueError, TypeError):
+            # Not JSON, or JSON without a subscriptable 'detail'
+            lines.append(f"Response: {body[:200]}...")
+    else:
+        lines.append(f"Server Error: {body[:200]}...")
+    
+    lines.append("-" * 50)
+    return "\n".join(lines)
+
 def test_endpoint(method, endpoint, data=None, auth_token=None):
-    """Test an API endpoint"""
+    """Test an API endpoint; return its status code and the report to print"""
     url = f"{BASE_URL}{endpoint}"
     headers = {
         'Content-Type': 'application/json',
@@ -19,33 +64,13 @@ def test_endpoint(method, endpoint, data=None, auth_token=None):
         headers['Authorization'] = f'Bearer {auth_token}'
     
     try:
-        if method.upper() == 'GET':
-            response = requests.get(url, headers=headers)
-        elif method.upper() == 'POST':
-            response = requests.post(url, headers=headers, json=data)
-        
-        print(f"{method.upper()} {endpoint}")
-        print(f"Status: {response.status_code}")
-        
-        if response.status_code < 500:
-            try:
-                result = response.json()
-                if 'detail' in result:
-                    print(f"Response: {result['detail']}")
-                else:
-                    print(f"Response: {json.dumps(result, indent=2)[:200]}...")
-            except:
-                print(f"Response: {response.text[:200]}...")
-        else:
-            print(f"Server Error: {response.text[:200]}...")
-        
-        print("-" * 50)
-        return response.status_code
-        
-    except Exception as e:
-        print(f"Error testing {endpoint}: {e}")
-        print("-" * 50)
-        return None
+        response = SESSION.request(method.upper(), url, headers=headers, json=data,
+                                   timeout=REQUEST_TIMEOUT, stream=True)
+        body = read_preview(response)
+    except requests.RequestException as e:
+        return None, f"Error testing {endpoint}: {e}\n" + "-" * 50
+    
+    return response.status_code, format_report(method, endpoint, response.status_code, body)
 
 def main():
     print("🧪 Testing Enhanced Invoice API Endpoints")
@@ -80,8 +105,15 @@ def main():
     auth_required = []
     broken_endpoints = []
     
-    for method, endpoint, data in endpoints_to_test:
-        status = test_endpoint(method, endpoint, data)
+    # The checks are independent, so run them concurrently; reports are
+    # printed afterwards in the original order
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(test_endpoint, method, endpoint, data)
+                   for method, endpoint, data in endpoints_to_test]
+    
+    for (method, endpoint, data), future in zip(endpoints_to_test, futures):
+        status, report = future.result()
+        print(report)
         
         if status == 401 or status == 403:
             auth_required.append(f"{method} {endpoint}")